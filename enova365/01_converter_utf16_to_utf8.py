@@ -1,9 +1,28 @@
 import os
 import re
+import codecs
 import argparse
 import logging
+from dataclasses import dataclass, field
 from prettytable import PrettyTable
-from typing import List, Tuple
+from typing import Iterator, List
+
+# Wyrażenia regularne kompilowane raz przy ładowaniu modułu
+WHITESPACE_RE = re.compile(r"\s+")
+FIELD_SEPARATOR_RE = re.compile(r"\t| {2,}")
+
+# Tablica translacji usuwająca cudzysłowy
+QUOTE_DELETE_TABLE = str.maketrans("", "", '"')
+
+# Rozmiar bufora zapisu pliku wyjściowego (1 MiB)
+WRITE_BUFFER_SIZE = 1 << 20
+
+@dataclass
+class ProcessingStats:
+    """Liczniki i dane zbierane podczas strumieniowego przetwarzania pliku."""
+    accepted: int = 0
+    skipped_lines: List[str] = field(default_factory=list)
+    rows: List[List[str]] = field(default_factory=list)
 
 def configure_logging(verbose: bool) -> None:
     """Konfiguruje logger w zależności od trybu verbose."""
@@ -14,40 +33,79 @@ def configure_logging(verbose: bool) -> None:
 
 def validate_file(input_file: str) -> None:
     """Sprawdza, czy plik istnieje i czy nie jest pusty."""
-    if not os.path.exists(input_file):
-        raise FileNotFoundError(f"Błąd: Plik {input_file} nie istnieje.")
-    if os.path.getsize(input_file) == 0:
+    try:
+        file_stat = os.stat(input_file)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Błąd: Plik {input_file} nie istnieje.") from None
+    if file_stat.st_size == 0:
         raise ValueError(f"Błąd: Plik {input_file} jest pusty.")
 
-def process_file_content(content: List[str], expected_header: str) -> Tuple[List[str], List[str], PrettyTable]:
-    """Przetwarza zawartość pliku i zwraca oczyszczoną zawartość oraz listę pominiętych wierszy."""
-    cleaned_content = []
-    skipped_lines = []
+def decode_utf16(raw: bytes) -> str:
+    """Dekoduje surowe bajty UTF-16 do tekstu, usuwając BOM, jeśli występuje."""
+    if raw.startswith(codecs.BOM_UTF16_LE):
+        return raw[len(codecs.BOM_UTF16_LE):].decode('utf-16-le')
+    if raw.startswith(codecs.BOM_UTF16_BE):
+        return raw[len(codecs.BOM_UTF16_BE):].decode('utf-16-be')
+    return raw.decode('utf-16')
+
+def split_lines(text: str) -> List[str]:
+    """Dzieli tekst na wiersze tylko na \\r\\n, \\r i \\n (jak readlines() w trybie tekstowym)."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+def build_table(rows: List[List[str]]) -> PrettyTable:
+    """Tworzy tabelę z zaakceptowanymi wierszami."""
     table = PrettyTable()
     table.field_names = ["Kod", "Nazwisko", "Imię", "Dział", "Stanowisko"]
+    for row in rows:
+        table.add_row(row)
+    return table
+
+def process_file_content(content: List[str], expected_header: str, stats: ProcessingStats, show_table: bool = False) -> Iterator[bytes]:
+    """Przetwarza zawartość pliku i zwraca kolejne oczyszczone wiersze zakodowane w UTF-8.
+
+    Liczba zapisanych wierszy i pominięte wiersze trafiają do stats, a wiersze tabeli
+    są zbierane tylko wtedy, gdy show_table jest ustawione.
+    """
+    # Nagłówek bez białych znaków wyliczany jest tylko raz
+    normalized_header = WHITESPACE_RE.sub("", expected_header)
+    header_first_char = normalized_header[:1]
+    header_length = len(normalized_header)
+
+    # Metody używane w pętli wiązane lokalnie, aby ograniczyć wyszukiwanie atrybutów
+    remove_whitespace = WHITESPACE_RE.sub
+    split_fields = FIELD_SEPARATOR_RE.split
+    skip_line = stats.skipped_lines.append
+    add_row = stats.rows.append
 
     for line in content:
         line_cleaned = line.strip()
 
-        # Sprawdzanie i pomijanie nagłówka
-        if re.sub(r"\s+", "", line_cleaned) == re.sub(r"\s+", "", expected_header):
-            skipped_lines.append(line_cleaned)
+        # Sprawdzanie i pomijanie nagłówka - wyrażenie regularne uruchamiane jest tylko dla wierszy,
+        # które mogą być nagłówkiem (ten sam pierwszy znak i wystarczająca długość)
+        if (line_cleaned.startswith(header_first_char) and len(line_cleaned) >= header_length
+                and remove_whitespace("", line_cleaned) == normalized_header):
+            skip_line(line_cleaned)
             continue
 
-        # Podział na pola przy użyciu tabulatorów lub wielu spacji
-        fields = re.split(r'\t| {2,}', line_cleaned)
-
-        # Usunięcie cudzysłowów
-        fields = [field.replace('"', '') for field in fields]
+        # Podział na pola przy użyciu tabulatorów - cudzysłowy nie wpływają na ten podział,
+        # więc usuwane są z całego wiersza naraz
+        fields = line_cleaned.translate(QUOTE_DELETE_TABLE).split("\t")
+        if len(fields) != 5:
+            # Podział przy użyciu wielu spacji musi działać na oryginalnym wierszu - usunięcie
+            # cudzysłowu otoczonego spacjami łączyłoby je w jeden separator
+            fields = [value.translate(QUOTE_DELETE_TABLE) for value in split_fields(line_cleaned)]
 
         # Sprawdzenie, czy mamy 5 kolumn (Kod, Nazwisko, Imię, Dział, Stanowisko)
         if len(fields) == 5:
-            table.add_row(fields)
-            cleaned_content.append("\t".join(fields) + "\n")
+            stats.accepted += 1
+            if show_table:
+                add_row(fields)
+            yield f"{fields[0]}\t{fields[1]}\t{fields[2]}\t{fields[3]}\t{fields[4]}\n".encode('utf-8')
         else:
-            skipped_lines.append(line_cleaned)
-    
-    return cleaned_content, skipped_lines, table
+            skip_line(line_cleaned)
 
 def convert_to_utf8(input_file: str, verbose: bool = False, show_table: bool = False) -> None:
     configure_logging(verbose)
@@ -59,10 +117,11 @@ def convert_to_utf8(input_file: str, verbose: bool = False, show_table: bool = F
         # Tworzenie nazwy pliku wyjściowego, dodając '-utf8' przed rozszerzeniem
         output_file = os.path.splitext(input_file)[0] + '-utf8.txt'
 
-        # Otwieranie pliku z kodowaniem UTF-16
+        # Otwieranie pliku i dekodowanie całej zawartości z UTF-16 za jednym razem
         try:
-            with open(input_file, 'r', encoding='utf-16') as file:
-                content = file.readlines()
+            with open(input_file, 'rb') as file:
+                raw = file.read()
+            content = split_lines(decode_utf16(raw))
             logging.info(f"Plik {input_file} został pomyślnie otwarty.")
         except UnicodeDecodeError:
             logging.error(f"Błąd: Plik {input_file} nie jest w formacie UTF-16.")
@@ -71,30 +130,32 @@ def convert_to_utf8(input_file: str, verbose: bool = False, show_table: bool = F
         # Oczekiwany nagłówek
         expected_header = "Kod\tNazwisko\tImie\tDział\tZatrudnienie".strip()
 
-        # Przetwarzanie zawartości
-        cleaned_content, skipped_lines, table = process_file_content(content, expected_header)
+        # Przetwarzanie zawartości - wiersze są generowane w trakcie zapisu
+        stats = ProcessingStats()
+        cleaned_lines = process_file_content(content, expected_header, stats, show_table)
         
-        logging.debug(f"Liczba odczytanych wierszy: {len(content)}")
+        logging.debug("Liczba odczytanych wierszy: %d", len(content))
 
-        # Zapis do nowego pliku w UTF-8
+        # Strumieniowy zapis do nowego pliku w UTF-8
         try:
-            with open(output_file, 'w', encoding='utf-8') as file:
-                file.writelines(cleaned_content)
+            with open(output_file, 'wb', buffering=WRITE_BUFFER_SIZE) as file:
+                file.writelines(cleaned_lines)
             logging.info(f"Plik wyjściowy {output_file} został zapisany pomyślnie.")
         except OSError as os_err:
             logging.error(f"Błąd podczas zapisywania pliku: {output_file}, {os_err}")
             return
 
         # Sprawdzanie różnicy w liczbie zapisanych wierszy
-        if len(content) != len(cleaned_content):
-            logging.warning(f"Liczba odczytanych ({len(content)}) i zapisanych ({len(cleaned_content)}) wierszy jest różna!")
-            logging.debug("Wiersze, które nie zostały zapisane:")
-            for idx, skipped in enumerate(skipped_lines, start=1):
-                logging.debug(f"{idx}. [{skipped}]")
+        if len(content) != stats.accepted:
+            logging.warning(f"Liczba odczytanych ({len(content)}) i zapisanych ({stats.accepted}) wierszy jest różna!")
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("Wiersze, które nie zostały zapisane:")
+                for idx, skipped in enumerate(stats.skipped_lines, start=1):
+                    logging.debug("%d. [%s]", idx, skipped)
 
         # Wyświetlenie tabeli, jeśli --table (-t) jest podane
         if show_table:
-            print(table)
+            print(build_table(stats.rows))
 
     except (FileNotFoundError, ValueError) as e:
         logging.error(e)
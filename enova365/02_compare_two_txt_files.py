@@ -1,11 +1,54 @@
 import os
+import codecs
+import io
+import functools
 import logging
 import argparse
-from prettytable import PrettyTable
-from typing import List, Tuple, Dict
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Tuple, Dict
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from charset_normalizer import from_path
 
+# Znaczniki BOM i odpowiadające im kodowania (UTF-32 przed UTF-16, bo BOM UTF-32 LE zaczyna się od BOM UTF-16 LE)
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Rozmiar fragmentów, w których plik jest sprawdzany pod kątem UTF-8 (64 KiB)
+ENCODING_PROBE_SIZE = 64 * 1024
+
+# Nagłówek pliku pomijany podczas odczytu
+HEADER = "Kod\tNazwisko\tImie\tDział\tZatrudnienie"
+
+@dataclass
+class ColumnarData:
+    """
+    Dane pliku w układzie kolumnowym: osobna lista dla każdej kolumny
+    (Kod, Nazwisko, Imie, Dział, Zatrudnienie) oraz indeks 'Kod' -> numer wiersza.
+    """
+    index: Dict[str, int] = field(default_factory=dict)
+    columns: Tuple[List[str], ...] = field(default_factory=lambda: ([], [], [], [], []))
+
+    def add_row(self, fields: List[str]) -> None:
+        """Dodaje wiersz; powtórzony 'Kod' nadpisuje wcześniejsze wartości w tym samym miejscu."""
+        position = self.index.get(fields[0])
+        if position is None:
+            self.index[fields[0]] = len(self.columns[0])
+            for column, value in zip(self.columns, fields):
+                column.append(value)
+        else:
+            for column, value in zip(self.columns, fields):
+                column[position] = value
+
+    def row(self, position: int) -> Tuple[str, ...]:
+        """Zwraca pola wiersza (bez 'Kod') o podanym numerze."""
+        return tuple(column[position] for column in self.columns[1:])
+
 def configure_logging(verbose: bool) -> None:
     """Konfiguruje logger w zależności od trybu verbose."""
     level = logging.DEBUG if verbose else logging.INFO
@@ -13,11 +56,70 @@ def configure_logging(verbose: bool) -> None:
 
 def validate_file(input_file: str) -> None:
     """Sprawdza, czy plik istnieje i czy nie jest pusty."""
-    if not os.path.exists(input_file):
-        raise FileNotFoundError(f"Błąd: Plik {input_file} nie istnieje.")
-    if os.path.getsize(input_file) == 0:
+    try:
+        file_stat = os.stat(input_file)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Błąd: Plik {input_file} nie istnieje.") from None
+    if file_stat.st_size == 0:
         raise ValueError(f"Błąd: Plik {input_file} jest pusty.")
 
+def _is_utf8(file: BinaryIO, prefix: bytes) -> bool:
+    """
+    Sprawdza, czy plik jest w całości poprawnym UTF-8, dekodując go fragmentami.
+    Bajty zerowe wykluczają UTF-8 - występują w tekście UTF-16/UTF-32 bez BOM.
+    
+    Args:
+        file (BinaryIO): Plik otwarty w trybie binarnym, ustawiony za odczytanym prefiksem.
+        prefix (bytes): Już odczytany początek pliku.
+    
+    Returns:
+        bool: True, jeśli cały plik jest poprawnym UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    chunk = prefix
+    try:
+        while chunk:
+            if b"\x00" in chunk:
+                return False
+            decoder.decode(chunk)
+            chunk = file.read(ENCODING_PROBE_SIZE)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+@functools.lru_cache(maxsize=256)
+def _detect_encoding_cached(file_path: str, mtime_ns: int, size: int) -> str:
+    """
+    Wykrywa kodowanie pliku. Wynik jest zapamiętywany dla kombinacji ścieżki,
+    czasu modyfikacji i rozmiaru, więc zmiana pliku unieważnia wpis w pamięci podręcznej.
+    
+    Args:
+        file_path (str): Ścieżka do pliku.
+        mtime_ns (int): Czas ostatniej modyfikacji pliku w nanosekundach.
+        size (int): Rozmiar pliku w bajtach.
+    
+    Returns:
+        str: Nazwa wykrytego kodowania.
+    """
+    with open(file_path, 'rb') as file:
+        prefix = file.read(ENCODING_PROBE_SIZE)
+
+        # Szybka ścieżka: plik zaczyna się od znacznika BOM
+        for bom, encoding in BOM_ENCODINGS:
+            if prefix.startswith(bom):
+                return encoding
+
+        # Szybka ścieżka: cały plik jest poprawnym UTF-8 (obejmuje również ASCII)
+        if _is_utf8(file, prefix):
+            return "utf-8"
+
+    # Wolna ścieżka: pełna analiza przez charset_normalizer
+    result = from_path(file_path).best()
+    if result is None:
+        raise ValueError(f"Nie udało się wykryć kodowania dla pliku: {file_path}")
+    return result.encoding
+
 def detect_encoding(file_path: str) -> str:
     """
     Automatyczne wykrywanie kodowania pliku.
@@ -29,15 +131,20 @@ def detect_encoding(file_path: str) -> str:
         str: Nazwa wykrytego kodowania.
     """
     try:
-        result = from_path(file_path).best()
-        if result is None:
-            raise ValueError(f"Nie udało się wykryć kodowania dla pliku: {file_path}")
-        return result.encoding
+        stat = os.stat(file_path)
+        return _detect_encoding_cached(file_path, stat.st_mtime_ns, stat.st_size)
     except Exception as e:
         logging.error(f"Nie udało się wykryć kodowania pliku: {e}")
         raise
 
-def read_file(file_path: str) -> Tuple[Dict[str, List[str]], List[str]]:
+def split_lines(text: str) -> List[str]:
+    """Dzieli tekst na wiersze tylko na \\r\\n, \\r i \\n (jak readlines() w trybie tekstowym)."""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+def read_file(file_path: str) -> Tuple[ColumnarData, List[str]]:
     """
     Odczytuje zawartość pliku, usuwa niepotrzebne wiersze i zwraca oczyszczone dane.
     
@@ -45,7 +152,7 @@ def read_file(file_path: str) -> Tuple[Dict[str, List[str]], List[str]]:
         file_path (str): Ścieżka do pliku.
     
     Returns:
-        dict: Słownik z 'Kod' jako klucz i listą pozostałych pól jako wartość.
+        ColumnarData: Dane w układzie kolumnowym z indeksem po polu 'Kod'.
         list: Lista pominiętych linii.
     """
     try:
@@ -53,32 +160,40 @@ def read_file(file_path: str) -> Tuple[Dict[str, List[str]], List[str]]:
         encoding = detect_encoding(file_path)
         logging.info(f"Wykryto kodowanie: {encoding} dla pliku {file_path}")
 
-        with open(file_path, 'r', encoding=encoding) as file:
-            content = file.readlines()
-
-        data = {}
+        data = ColumnarData()
+        add_row = data.add_row
         skipped_lines = []
+        skip_line = skipped_lines.append
+        intern = sys.intern
+
+        # Odczyt i dekodowanie całego pliku za jednym razem
+        with open(file_path, 'rb') as file:
+            text = file.read().decode(encoding)
+
+        for line in split_lines(text):
+            line = line.strip()
 
-        for line in content:
             # Pomijaj nagłówek
-            if line.strip() == "Kod\tNazwisko\tImie\tDział\tZatrudnienie":
-                skipped_lines.append(line.strip())
+            if line == HEADER:
+                skip_line(line)
                 continue
 
-            fields = line.strip().split("\t")
+            fields = line.split("\t")
             if len(fields) == 5:
-                kod, nazwisko, imie, dzial, zatrudnienie = fields
-                data[kod] = [nazwisko, imie, dzial, zatrudnienie]
+                # Dział i Zatrudnienie powtarzają się w wielu wierszach - internowanie współdzieli obiekty str
+                fields[3] = intern(fields[3])
+                fields[4] = intern(fields[4])
+                add_row(fields)
             else:
-                skipped_lines.append(line.strip())
+                skip_line(line)
 
         return data, skipped_lines
 
     except Exception as e:
         logging.error(f"An error occurred while reading the file: {e}", exc_info=True)
-        return {}, []
+        return ColumnarData(), []
 
-def display_content(content: List[Tuple[str, List[str], bool]], title: str) -> None:
+def display_content(content: List[Tuple[str, Tuple[str, ...], bool]], title: str) -> None:
     """
     Wyświetla zawartość pliku w formie tabeli z numerami wierszy i flagą is_active.
     
@@ -86,22 +201,40 @@ def display_content(content: List[Tuple[str, List[str], bool]], title: str) -> N
         content (list): Lista zawierająca oczyszczone wiersze z flagami is_active.
         title (str): Tytuł tabeli.
     """
-    table = PrettyTable()
-    table.title = title
-    table.field_names = ["Kod", "Nazwisko", "Imię", "Dział", "Zatrudnienie", "is_active"]
-    
-    for kod, fields, is_active in content:
-        table.add_row([kod] + fields + [is_active])
-    
-    print(table)
+    header = ["Kod", "Nazwisko", "Imię", "Dział", "Zatrudnienie", "is_active"]
+    rows = [[kod, *fields, str(is_active)] for kod, fields, is_active in content]
+
+    # Szerokość każdej kolumny wyliczana jednym przejściem po jej wartościach
+    widths = [max(len(cell) for cell in column) for column in zip(header, *rows)]
+
+    # Tytuł dłuższy niż tabela poszerza ostatnią kolumnę
+    inner_width = sum(widths) + 3 * (len(widths) - 1)
+    if len(title) > inner_width:
+        widths[-1] += len(title) - inner_width
+        inner_width = len(title)
 
-def find_differences(content1: Dict[str, List[str]], content2: Dict[str, List[str]]) -> Tuple[List[Tuple[str, List[str], bool]], List[Tuple[str, List[str], bool]], List[Tuple[str, List[str], bool]]]:
+    row_format = "| " + " | ".join("{:<" + str(width) + "}" for width in widths) + " |\n"
+    separator = "+" + "+".join("-" * (width + 2) for width in widths) + "+\n"
+
+    output = io.StringIO()
+    output.write("+" + "-" * (inner_width + 2) + "+\n")
+    output.write(f"| {title:^{inner_width}} |\n")
+    output.write(separator)
+    output.write(row_format.format(*header))
+    output.write(separator)
+    for row in rows:
+        output.write(row_format.format(*row))
+    output.write(separator)
+
+    print(output.getvalue(), end="")
+
+def find_differences(content1: ColumnarData, content2: ColumnarData) -> Tuple[List[Tuple[str, Tuple[str, ...], bool]], List[Tuple[str, Tuple[str, ...], bool]], List[Tuple[str, Tuple[str, ...], bool]]]:
     """
     Znajduje różnice między dwoma plikami na podstawie pola 'Kod'.
     
     Args:
-        content1 (dict): Dane z pierwszego pliku.
-        content2 (dict): Dane z drugiego pliku.
+        content1 (ColumnarData): Dane z pierwszego pliku.
+        content2 (ColumnarData): Dane z drugiego pliku.
     
     Returns:
         tuple: (list, list, list)
@@ -109,12 +242,26 @@ def find_differences(content1: Dict[str, List[str]], content2: Dict[str, List[st
             - Lista wierszy unikalnych dla drugiego pliku.
             - Lista wierszy wspólnych dla obu plików, ale z różnicami w polach.
     """
-    set1 = set(content1.keys())
-    set2 = set(content2.keys())
+    unique_to_file1 = []
+    unique_to_file2 = []
+    modified_rows = []
+    index1 = content1.index
+    get_from_file2 = content2.index.get
+
+    # Pary odpowiadających sobie kolumn (bez 'Kod') porównywane pole po polu
+    column_pairs = list(zip(content1.columns[1:], content2.columns[1:]))
+
+    # Jedno przejście po pierwszym pliku wykrywa wiersze unikalne i zmodyfikowane
+    for kod, position1 in index1.items():
+        position2 = get_from_file2(kod)
+        if position2 is None:
+            unique_to_file1.append((kod, content1.row(position1), False))
+        elif any(column1[position1] != column2[position2] for column1, column2 in column_pairs):
+            modified_rows.append((kod, content1.row(position1), True))
 
-    unique_to_file1 = [(kod, content1[kod], False) for kod in set1 - set2]
-    unique_to_file2 = [(kod, content2[kod], True) for kod in set2 - set1]
-    modified_rows = [(kod, content1[kod], True) for kod in set1 & set2 if content1[kod] != content2[kod]]
+    for kod, position2 in content2.index.items():
+        if kod not in index1:
+            unique_to_file2.append((kod, content2.row(position2), True))
 
     return unique_to_file1, unique_to_file2, modified_rows
 
@@ -135,16 +282,19 @@ def compare_files(file1: str, file2: str, verbose: bool = False, show_tables: bo
         validate_file(file1)
         validate_file(file2)
 
-        # Odczytaj zawartość plików
-        content1, skipped1 = read_file(file1)
-        content2, skipped2 = read_file(file2)
+        # Odczytaj zawartość plików równolegle - oba odczyty są od siebie niezależne
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            future1 = executor.submit(read_file, file1)
+            future2 = executor.submit(read_file, file2)
+            content1, skipped1 = future1.result()
+            content2, skipped2 = future2.result()
 
         # Logowanie informacji po odczytaniu plików
         logging.info(f"Plik {file1} został pomyślnie odczytany.")
         logging.info(f"Plik {file2} został pomyślnie odczytany.")
 
-        logging.debug(f"Plik {file1} został odczytany, pominięto {len(skipped1)} wierszy.")
-        logging.debug(f"Plik {file2} został odczytany, pominięto {len(skipped2)} wierszy.")
+        logging.debug("Plik %s został odczytany, pominięto %d wierszy.", file1, len(skipped1))
+        logging.debug("Plik %s został odczytany, pominięto %d wierszy.", file2, len(skipped2))
 
         # Znajdź unikalne i zmienione wiersze dla obu plików
         unique_to_file1, unique_to_file2, modified_rows = find_differences(content1, content2)